@@ -1,29 +1,89 @@
 # app/api/ingest.py
 import os, uuid, shutil
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Query, HTTPException
 from sqlalchemy import text
 from ..db import get_engine
 from ..workers.tasks import ingest_consumo
-from ..utils.s3 import presign_put, object_uri
+from ..workers import scheduling
+from ..utils.s3 import presign_put, object_uri, head_object
+from ..utils.cache import invalidate
 
 router = APIRouter()
 
 @router.post('/upload')
-def local_upload(file: UploadFile = File(...)):
+def local_upload(file: UploadFile = File(...),
+                 priority: int | None = Query(None, ge=0, le=9, description="0 = más urgente; por defecto según tamaño"),
+                 tenant: str = Query("default")):
     out_dir = 'uploads'
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, file.filename)
     with open(out_path, 'wb') as f:
         shutil.copyfileobj(file.file, f)
 
+    # Prioridad: explícita o por tamaño, castigada si el tenant ya tiene jobs en curso
+    prio = scheduling.job_priority(os.path.getsize(out_path), tenant, priority)
+
     eng = get_engine()
     jid = uuid.uuid4()
     # ⬇️ USAR con.execute(text(...), params) (no exec_driver_sql con :param)
     with eng.begin() as con:
         con.execute(
-            text("INSERT INTO jobs(job_id,status,file_uri) VALUES (:j,'queued',:u)"),
-            {"j": jid, "u": out_path}
+            text("INSERT INTO jobs(job_id,status,file_uri,tenant,priority) VALUES (:j,'queued',:u,:t,:p)"),
+            {"j": jid, "u": out_path, "t": tenant, "p": prio}
         )
+    invalidate("jobs")
     # Encolar el trabajo
-    ingest_consumo.delay(str(jid), out_path)
-    return {"job_id": str(jid), "file_uri": out_path}
+    scheduling.acquire(tenant)
+    ingest_consumo.apply_async((str(jid), out_path), priority=prio)
+    return {"job_id": str(jid), "file_uri": out_path, "tenant": tenant, "priority": prio}
+
+# ---- Subida directa a object storage (MinIO/S3) vía URL prefirmada ----
+
+@router.post('/presign')
+def presign_upload(filename: str, content_type: str = "application/octet-stream", tenant: str = "default"):
+    """Registra el job y devuelve una URL PUT prefirmada; el archivo no pasa por la API."""
+    jid = uuid.uuid4()
+    key = f"uploads/{jid}/{os.path.basename(filename)}"
+    url = presign_put(key, content_type)
+    if not url:
+        raise HTTPException(status_code=503, detail='object storage not configured')
+    uri = object_uri(key)
+
+    eng = get_engine()
+    with eng.begin() as con:
+        con.execute(
+            text("INSERT INTO jobs(job_id,status,file_uri,tenant) VALUES (:j,'awaiting_upload',:u,:t)"),
+            {"j": jid, "u": uri, "t": tenant}
+        )
+    invalidate("jobs")
+    # El PUT debe enviar exactamente este Content-Type (forma parte de la firma)
+    return {"job_id": str(jid), "upload_url": url, "method": "PUT", "content_type": content_type, "file_uri": uri}
+
+@router.post('/complete/{job_id}')
+def complete_upload(job_id: str, priority: int | None = Query(None, ge=0, le=9)):
+    """Confirma que el objeto ya está en el bucket y encola la ingesta (el worker lo lee en streaming)."""
+    try: jid = uuid.UUID(job_id)
+    except Exception: raise HTTPException(status_code=400, detail='invalid job_id')
+
+    eng = get_engine()
+    with eng.connect() as con:
+        job = con.execute(text("SELECT status,file_uri,tenant FROM jobs WHERE job_id=:j"), {"j": jid}).mappings().first()
+    if not job: raise HTTPException(status_code=404, detail='job not found')
+    if job["status"] != 'awaiting_upload': raise HTTPException(status_code=409, detail=f"job already {job['status']}")
+
+    meta = head_object(job["file_uri"])
+    if not meta: raise HTTPException(status_code=400, detail='object not uploaded yet')
+
+    prio = scheduling.job_priority(int(meta["ContentLength"]), job["tenant"], priority)
+    with eng.begin() as con:
+        # Guardia contra dobles confirmaciones concurrentes
+        updated = con.execute(
+            text("UPDATE jobs SET status='queued', priority=:p WHERE job_id=:j AND status='awaiting_upload'"),
+            {"j": jid, "p": prio}
+        ).rowcount
+    if not updated: raise HTTPException(status_code=409, detail='job already queued')
+    invalidate("jobs")
+
+    scheduling.acquire(job["tenant"])
+    ingest_consumo.apply_async((job_id, job["file_uri"]), priority=prio)
+    return {"job_id": job_id, "file_uri": job["file_uri"], "tenant": job["tenant"], "priority": prio}
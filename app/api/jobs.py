@@ -1,21 +1,53 @@
-import uuid
-from fastapi import APIRouter, HTTPException
+import math, uuid
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
 from sqlalchemy import text
+from ..config.settings import settings
 from ..db import get_engine
+from ..utils.cache import cached_json
+from ..models.simulation import SEGMENT_COLS, job_state, simulate
 router=APIRouter()
 @router.get('/jobs/{job_id}')
-def job_status(job_id:str):
+def job_status(job_id:str, request:Request):
     try: jid=uuid.UUID(job_id)
     except Exception: raise HTTPException(status_code=400, detail='invalid job_id')
-    eng=get_engine()
-    with eng.connect() as con:
-        r=con.execute(text("SELECT job_id::text,status,file_uri,created_at,updated_at FROM jobs WHERE job_id=:j"), {'j':jid}).mappings().first()
-        if not r: raise HTTPException(status_code=404, detail='job not found')
-        return dict(r)
+    def build():
+        eng=get_engine()
+        with eng.connect() as con:
+            r=con.execute(text("SELECT job_id::text,status,file_uri,tenant,priority,rows_ok,rows_rejected,rejects_uri,created_at,updated_at FROM jobs WHERE job_id=:j"), {'j':jid}).mappings().first()
+            if not r: raise HTTPException(status_code=404, detail='job not found')
+            return dict(r)
+    return cached_json(request, 'jobs', f'job:{jid}', settings.CACHE_TTL_JOBS, build)
 @router.get('/jobs')
-def list_jobs(limit:int=50):
-    eng=get_engine()
-    with eng.connect() as con:
-        rows=con.execute(text("""SELECT job_id::text,status,file_uri,created_at,updated_at
-                                FROM jobs ORDER BY created_at DESC LIMIT :l"""), {'l':limit}).mappings().all()
-        return [dict(r) for r in rows]
+def list_jobs(request:Request, limit:int=50):
+    def build():
+        eng=get_engine()
+        with eng.connect() as con:
+            rows=con.execute(text("""SELECT job_id::text,status,file_uri,tenant,priority,rows_ok,rows_rejected,rejects_uri,created_at,updated_at
+                                    FROM jobs ORDER BY created_at DESC LIMIT :l"""), {'l':limit}).mappings().all()
+            return [dict(r) for r in rows]
+    return cached_json(request, 'jobs', f'list:{limit}', settings.CACHE_TTL_JOBS, build)
+class SimulationIn(BaseModel):
+    thresholds:list[float]|None=Field(None, max_length=2000)
+    start:float=0.05; stop:float=0.95; step:float=Field(0.01, gt=0)
+    segment_by:list[str]=[]
+@router.post('/jobs/{job_id}/simulate')
+def simulate_thresholds(job_id:str, body:SimulationIn):
+    """What-if de umbrales: alertas/precisión/recall por segmento; no escribe en resultados."""
+    try: jid=uuid.UUID(job_id)
+    except Exception: raise HTTPException(status_code=400, detail='invalid job_id')
+    bad=[c for c in body.segment_by if c not in SEGMENT_COLS]
+    if bad: raise HTTPException(status_code=400, detail=f'segment_by must be in {list(SEGMENT_COLS)}')
+    if body.thresholds: thr=body.thresholds
+    else:
+        # Tamaño de la grilla antes de reservar memoria: un step diminuto no debe crear millones de floats
+        n=math.floor((body.stop-body.start)/body.step+1e-9)+1 if body.stop>=body.start else 0
+        if not 1<=n<=2000: raise HTTPException(status_code=400, detail='between 1 and 2000 thresholds')
+        thr=np.round(body.start+body.step*np.arange(n), 6).tolist()
+    # Solo jobs publicados: un job en curso (o seguidor aún sin fan-out) tiene resultados parciales
+    state=job_state(jid)
+    if not state: raise HTTPException(status_code=404, detail='job not found')
+    if state.status!='done': raise HTTPException(status_code=409, detail=f'job is {state.status}, not done')
+    return {"job_id": job_id, "thresholds": thr, "segment_by": body.segment_by,
+            "segments": simulate(jid, thr, tuple(body.segment_by), version=state.updated_at)}
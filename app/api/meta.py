@@ -1,21 +1,25 @@
 # app/api/meta.py
-import os, shutil, pandas as pd
+import os, shutil, numpy as np, pandas as pd
 from fastapi import APIRouter, UploadFile, File
 from sqlalchemy import text
 from ..db import get_engine
 
 router = APIRouter()
 
-def to_bool(v):
-    if pd.isna(v): return None
-    s = str(v).strip().lower()
-    if s in {"1","true","t","si","sí","y","yes"}: return True
-    if s in {"0","false","f","no","n"}: return False
-    # fallback: números distintos de 0 -> True
-    try:
-        return bool(int(float(s)))
-    except Exception:
-        return s in {"x"}  # ajusta si manejas otra marca
+_TRUE = {"1","true","t","si","sí","y","yes"}
+_FALSE = {"0","false","f","no","n"}
+
+def to_bool(col: pd.Series) -> pd.Series:
+    """Normaliza EFECTIVA a True/False/None en una sola pasada vectorizada."""
+    s = col.astype("string").str.strip().str.lower()
+    num = pd.to_numeric(s, errors="coerce")
+    # fallback: números distintos de 0 -> True; "x" -> True (ajusta si manejas otra marca)
+    out = pd.Series(np.where(num.notna(), num.fillna(0).astype(int) != 0, s.eq("x").fillna(False)),
+                    index=col.index, dtype=object)
+    out[s.isin(_TRUE).fillna(False)] = True
+    out[s.isin(_FALSE).fillna(False)] = False
+    out[col.isna()] = None
+    return out
 
 @router.post("/upload")
 def upload_meta(file: UploadFile = File(...)):
@@ -35,7 +39,9 @@ def upload_meta(file: UploadFile = File(...)):
         return {"ok": False, "error": "META debe contener CUENTA y EFECTIVA"}
 
     # ✅ Normaliza a boolean
-    df["EFECTIVA"] = df["EFECTIVA"].apply(to_bool)
+    df["EFECTIVA"] = to_bool(df["EFECTIVA"])
+    if df.empty:
+        return {"ok": True, "rows": 0}  # executemany con lista vacía falla por parámetros faltantes
 
     eng = get_engine()
     with eng.begin() as con:
@@ -46,7 +52,6 @@ def upload_meta(file: UploadFile = File(...)):
               SET efectiva = EXCLUDED.efectiva,
                   updated_at = now()
         """)
-        for r in df.to_dict("records"):
-            con.execute(sql, r)
+        con.execute(sql, df[["CUENTA", "EFECTIVA"]].to_dict("records"))
 
     return {"ok": True, "rows": int(len(df))}
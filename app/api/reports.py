@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Request
+from sqlalchemy import text
+from ..config.settings import settings
+from ..db import get_engine
+from ..utils.cache import cached_json
+router=APIRouter()
+@router.get('/kpis')
+def kpis(request:Request, limit:int=500):
+    def build():
+        eng=get_engine()
+        with eng.connect() as con:
+            rows=con.execute(text("SELECT * FROM vw_kpis LIMIT :l"), {'l':limit}).mappings().all()
+            return [dict(r) for r in rows]
+    return cached_json(request, 'kpis', f'kpis:{limit}', settings.CACHE_TTL_KPIS, build)
+@router.get('/alertas')
+def alertas(request:Request, trafo:str|None=None, estrato:str|None=None, limit:int=500):
+    def build():
+        eng=get_engine()
+        with eng.connect() as con:
+            rows=con.execute(text("""SELECT cuenta,job_id::text,score_hibrido,umbral_aplicado,trafo,estrato,tipo_usuario,tipo_poblacion,created_at
+                                    FROM vw_alertas WHERE decision
+                                      AND (CAST(:t AS TEXT) IS NULL OR trafo=:t) AND (CAST(:e AS TEXT) IS NULL OR estrato=:e)
+                                    ORDER BY score_hibrido DESC LIMIT :l"""), {'t':trafo,'e':estrato,'l':limit}).mappings().all()
+            return [dict(r) for r in rows]
+    return cached_json(request, 'kpis', f'alertas:{trafo}:{estrato}:{limit}', settings.CACHE_TTL_KPIS, build)
@@ -0,0 +1,22 @@
+from datetime import date
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from ..models.online import load_history, score_series
+router=APIRouter()
+class Lectura(BaseModel):
+    periodo: date
+    kwh: float
+class ScoreIn(BaseModel):
+    cuenta: str|None=None
+    lecturas: list[Lectura]|None=None
+@router.post('/score')
+def score(body:ScoreIn):
+    """Score inmediato de una cuenta: con sus lecturas recientes o leyendo stg_consumo."""
+    if body.lecturas:
+        kwh=[l.kwh for l in sorted(body.lecturas, key=lambda l: l.periodo)]
+    elif body.cuenta:
+        kwh=load_history(body.cuenta)
+        if kwh is None: raise HTTPException(status_code=404, detail='cuenta not found in stg_consumo')
+    else:
+        raise HTTPException(status_code=400, detail='cuenta or lecturas required')
+    return {"cuenta": body.cuenta, **score_series(kwh)}
@@ -1,8 +1,15 @@
 from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     DB_HOST:str="localhost"; DB_PORT:int=5432; DB_USER:str="postgres"; DB_PASSWORD:str="postgres"; DB_NAME:str="frauddb"
-    REDIS_URL:str="redis://localhost:6379/0"
+    REDIS_URL:str="redis://localhost:6379/0"; CACHE_TTL_JOBS:int=5; CACHE_TTL_KPIS:int=60
     S3_ENDPOINT:str|None=None; S3_ACCESS_KEY:str|None=None; S3_SECRET_KEY:str|None=None; S3_REGION:str|None="us-east-1"; S3_BUCKET:str|None=None; S3_USE_SSL:bool=False
+    S3_PUBLIC_ENDPOINT:str|None=None; INGEST_CHUNK_ROWS:int=50_000
     API_HOST:str="0.0.0.0"; API_PORT:int=8000
+    SCORE_HISTORY_CACHE_SIZE:int=50_000; SCORE_HISTORY_TTL:int=300; SCORE_MODEL_REFRESH:int=60; SIMULATION_CACHE_TTL:int=600
+    PRIORITY_DEFAULT:int=5; PRIORITY_SMALL_BYTES:int=1_000_000; PRIORITY_LARGE_BYTES:int=200_000_000; FAIRSHARE_MAX_PENALTY:int=3
+    COALESCE_WINDOW_SECS:int=30
+    SCORING_MODE:str="pandas"; SCORING_CHUNK_ROWS:int=100_000  # "chunked": float32 + cursor server-side, memoria acotada
+    VALIDATION_KWH_MAX:float|None=None; VALIDATION_BBOX:str="-4.3,13.5,-82.0,-66.8"; VALIDATION_MAX_REJECT_RATIO:float=0.2; REJECTS_ROOT:str="uploads/rejects"
+    TIER_HORIZON_MONTHS:int=24; TIER_ARCHIVE_ROOT:str="s3://fraud-archive/stg_consumo"
     class Config: env_file=".env"
 settings=Settings()
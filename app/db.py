@@ -1,6 +1,8 @@
+from functools import lru_cache
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
 from .config.settings import settings
+@lru_cache(maxsize=None)  # un engine (y su pool) por proceso, no uno por request
 def get_engine()->Engine:
     url=f"postgresql+psycopg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
     return create_engine(url, pool_pre_ping=True, pool_size=10, max_overflow=20)
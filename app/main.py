@@ -1,6 +1,7 @@
 from fastapi import FastAPI
-from .api import health, ingest, meta, jobs
+from .api import health, ingest, meta, jobs, reports, score
 from .db import init_db
+from .models.online import active_model
 def create_app():
     init_db()
     app=FastAPI(title='Fraud Automation API (Patched)')
@@ -8,5 +9,8 @@ def create_app():
     app.include_router(ingest.router, prefix='/ingest', tags=['ingest'])
     app.include_router(meta.router, prefix='/meta', tags=['meta'])
     app.include_router(jobs.router, tags=['jobs'])
+    app.include_router(reports.router, tags=['reports'])
+    app.include_router(score.router, tags=['score'])
+    active_model.refresh(force=True)  # /score no paga la carga del modelo en el primer request
     return app
 app=create_app()
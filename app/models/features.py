@@ -0,0 +1,38 @@
+# app/models/features.py
+"""Features de curvas (MCURVAS) por cuenta; las usan tanto el batch como POST /score."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from ..utils.benford import benford_pval
+
+FEATURES = ["prom_6", "std_12", "cv", "benford_pval"]
+
+def curve_features(kwh) -> dict[str, float]:
+    """Features sobre las últimas 12 lecturas propias de la cuenta (serie en orden cronológico).
+
+    No depende de qué otras cuentas se procesen en la misma pasada: no se alinea contra
+    los periodos del resto ni se rellenan huecos con 0.
+    """
+    arr = np.nan_to_num(np.asarray(kwh, dtype=float)[-12:], nan=0.0)
+    sample = arr[-6:] if arr.size >= 6 else arr
+    prom_6 = float(sample.mean()) if arr.size else 0.0
+    std_12 = float(arr.std(ddof=0)) if arr.size else 0.0
+    return {
+        "prom_6": prom_6,
+        "std_12": std_12,
+        "cv": std_12 / (prom_6 + 1e-6),
+        "benford_pval": benford_pval(sample),
+    }
+
+def curvas_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica `curve_features` a cada cuenta de un DataFrame (cuenta, periodo, kwh)."""
+    df = df.sort_values(["cuenta", "periodo"])
+    cuentas = df["cuenta"].to_numpy()
+    kwh = df["kwh"].to_numpy(dtype=float)
+    # Cortes posicionales por cuenta sobre el arreglo ordenado (sin groupby.apply)
+    starts = np.flatnonzero(np.r_[True, cuentas[1:] != cuentas[:-1]]) if len(df) else np.empty(0, int)
+    ends = np.r_[starts[1:], len(df)]
+    rows = [curve_features(kwh[s:e]) for s, e in zip(starts, ends)]
+    return pd.DataFrame(rows, columns=FEATURES).assign(cuenta=cuentas[starts])[["cuenta"] + FEATURES]
@@ -0,0 +1,98 @@
+# app/models/online.py
+"""Scoring en línea de una cuenta: features de app.models.features, modelo precargado y caché LRU de históricos."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+from sqlalchemy import text
+
+from ..config.settings import settings
+from ..db import get_engine
+from ..utils.lru import TTLCache
+from .features import FEATURES, curve_features
+from .supervised import MODEL_PATH, enough_labels, linear_params, predict_proba_linear
+
+# Últimas 12 lecturas por cuenta (evita ir a stg_consumo en cada request)
+_histories = TTLCache(settings.SCORE_HISTORY_CACHE_SIZE, settings.SCORE_HISTORY_TTL)
+
+def load_history(cuenta: str) -> np.ndarray | None:
+    """Últimas 12 lecturas de la cuenta en orden cronológico (PK (cuenta,periodo) → index scan)."""
+    kwh = _histories.get(cuenta)
+    if kwh is not None:
+        return kwh
+    with get_engine().connect() as con:
+        rows = con.execute(text("""
+            SELECT kwh FROM stg_consumo WHERE cuenta=:c ORDER BY periodo DESC LIMIT 12
+        """), {"c": cuenta}).scalars().all()
+    if not rows:
+        return None
+    kwh = np.array([float(v) if v is not None else 0.0 for v in reversed(rows)])
+    _histories.put(cuenta, kwh)
+    return kwh
+
+class _ActiveModel:
+    """Modelo supervisado + umbral activo, recargados como mucho cada SCORE_MODEL_REFRESH segundos."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = 0.0
+        self._mtime = None
+        self.model = None
+        self.coef = self.intercept = None
+        self.use_model = False
+        self.threshold, self.model_name, self.model_version = 0.60, "hybrid_default", "1.0.0"
+
+    def refresh(self, force: bool = False) -> "_ActiveModel":
+        if not force and time.monotonic() - self._loaded_at < settings.SCORE_MODEL_REFRESH:
+            return self
+        with self._lock:
+            if not force and time.monotonic() - self._loaded_at < settings.SCORE_MODEL_REFRESH:
+                return self  # otro hilo ya refrescó mientras esperábamos el lock
+            mtime = os.path.getmtime(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+            if mtime != self._mtime:
+                self.model = joblib.load(MODEL_PATH) if mtime else None
+                self._mtime = mtime
+                # Logística binaria: sigmoid(x·w + b) en NumPy, sin la validación de sklearn por llamada
+                self.coef, self.intercept = linear_params(self.model, np.float64) or (None, None)
+            with get_engine().connect() as con:
+                row = con.execute(text("SELECT model_name, model_version, threshold FROM vw_active_models LIMIT 1")).mappings().first()
+                labels = con.execute(text("""
+                    SELECT COUNT(*) AS n, COUNT(DISTINCT m.efectiva) AS k
+                    FROM features_curvas f JOIN meta_fraude m USING(cuenta)
+                """)).mappings().first()
+            # Misma regla que msupervisado_score: con META insuficiente el score es 0.5 aunque exista el pickle
+            self.use_model = enough_labels(labels["n"], labels["k"])
+            self.model_name = row["model_name"] if row else "hybrid_default"
+            self.model_version = row["model_version"] if row else "1.0.0"
+            self.threshold = float(row["threshold"]) if (row and row["threshold"] is not None) else 0.60
+            self._loaded_at = time.monotonic()
+        return self
+
+    def score(self, feats: dict[str, float]) -> float:
+        x = np.array([feats[f] for f in FEATURES], dtype=float)
+        if not self.use_model:
+            return 0.5
+        if self.coef is not None:
+            return float(predict_proba_linear(x, self.coef, self.intercept))
+        if self.model is not None:
+            return float(self.model.predict_proba(x.reshape(1, -1))[0, 1])
+        return 0.5  # mismo baseline que msupervisado_score sin modelo
+
+active_model = _ActiveModel()
+
+def score_series(kwh) -> dict:
+    feats = curve_features(kwh)
+    m = active_model.refresh()
+    s_sup = m.score(feats)
+    return {
+        "features": feats,
+        "score_supervisado": s_sup,
+        "score_hibrido": s_sup,
+        "umbral_aplicado": m.threshold,
+        "decision": s_sup >= m.threshold,
+        "model_name": m.model_name,
+        "model_version": m.model_version,
+    }
@@ -0,0 +1,104 @@
+# app/models/simulation.py
+"""Simulación what-if de umbrales sobre los scores publicados de un job (sin escribir en resultados)."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from ..config.settings import settings
+from ..db import get_engine
+from ..utils.lru import TTLCache
+
+SEGMENT_COLS = ("trafo", "estrato", "tipo_usuario", "tipo_poblacion")
+
+# La versión (jobs.updated_at) va en la clave: si el job se re-publica, la entrada vieja ya no se lee
+_scores = TTLCache(64, settings.SIMULATION_CACHE_TTL)    # (job_id, versión) → DataFrame de scores
+_prepared = TTLCache(256, settings.SIMULATION_CACHE_TTL)  # (job_id, versión, segmentos) → arreglos ordenados
+
+def job_state(job_id):
+    """(status, updated_at) del job, o None si no existe."""
+    with get_engine().connect() as con:
+        return con.execute(text("SELECT status, updated_at FROM jobs WHERE job_id=:j"), {"j": job_id}).first()
+
+def load_scores(job_id, version=None) -> pd.DataFrame:
+    """Scores del job + atributos de cuenta + etiqueta META (y: 1/0, -1 = sin visita)."""
+    df = _scores.get((job_id, version))
+    if df is not None:
+        return df
+    with get_engine().connect() as con:
+        df = pd.read_sql(text("""
+            SELECT r.score_hibrido::float8 AS score, c.trafo, c.estrato, c.tipo_usuario, c.tipo_poblacion,
+                   COALESCE(m.efectiva::int, -1) AS y
+            FROM resultados r
+            LEFT JOIN vw_cuenta_attrs c USING(cuenta)
+            LEFT JOIN meta_fraude m USING(cuenta)
+            WHERE r.job_id=:j AND r.score_hibrido IS NOT NULL
+        """), con, params={"j": job_id})
+    _scores.put((job_id, version), df)
+    return df
+
+def _prepare(job_id, segment_by: tuple[str, ...], version=None) -> dict:
+    """Ordena por (segmento, score) una sola vez y precalcula conteos acumulados."""
+    key = (job_id, version, segment_by)
+    prep = _prepared.get(key)
+    if prep is not None:
+        return prep
+    df = load_scores(job_id, version)
+    if segment_by:
+        codes, uniques = pd.MultiIndex.from_frame(df[list(segment_by)].fillna("")).factorize()
+        labels = [dict(zip(segment_by, u)) for u in uniques]
+    else:
+        codes, labels = np.zeros(len(df), dtype=np.int64), [{}]
+    score = df["score"].to_numpy(dtype=float)
+    y = df["y"].to_numpy()
+    # Clave entera exacta: código de segmento × (M+1) + rango del score entre los M scores distintos
+    uniq = np.unique(score)
+    stride = len(uniq) + 1
+    keyv = codes.astype(np.int64) * stride + np.searchsorted(uniq, score)
+    order = np.argsort(keyv, kind="stable")
+    n_seg = len(labels)
+    counts = np.bincount(codes, minlength=n_seg)
+    ends = np.cumsum(counts)
+    prep = {
+        "labels": labels,
+        "uniq": uniq,
+        "bases": np.arange(n_seg, dtype=np.int64) * stride,
+        "keys": keyv[order],
+        "ends": ends,
+        "starts": ends - counts,
+        "cum_pos": np.concatenate([[0], np.cumsum(y[order] == 1)]),
+        "cum_lab": np.concatenate([[0], np.cumsum(y[order] >= 0)]),
+    }
+    _prepared.put(key, prep)
+    return prep
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> list:
+    out = np.divide(num, den, out=np.full(num.shape, np.nan), where=den > 0)
+    return [None if np.isnan(v) else round(float(v), 6) for v in out]
+
+def simulate(job_id, thresholds, segment_by: tuple[str, ...] = (), version=None) -> list[dict]:
+    """Alertas, precisión y recall (vs meta_fraude) para cada (segmento, umbral) en una pasada vectorizada."""
+    prep = _prepare(job_id, segment_by, version)
+    # score ≥ t  ⇔  rango(score) ≥ nº de scores distintos < t
+    thr_rank = np.searchsorted(prep["uniq"], np.asarray(thresholds, dtype=float), side="left")
+    # Posición del primer score ≥ umbral dentro de cada segmento: matriz segmentos × umbrales
+    pos = np.searchsorted(prep["keys"], prep["bases"][:, None] + thr_rank[None, :], side="left")
+    ends, starts = prep["ends"][:, None], prep["starts"]
+    cum_pos, cum_lab = prep["cum_pos"], prep["cum_lab"]
+    alerts = ends - pos
+    tp = cum_pos[ends] - cum_pos[pos]
+    labeled_alerts = cum_lab[ends] - cum_lab[pos]
+    positives = cum_pos[prep["ends"]] - cum_pos[starts]
+
+    out = []
+    for g, seg in enumerate(prep["labels"]):
+        out.append({
+            **seg,
+            "cuentas": int(prep["ends"][g] - starts[g]),
+            "positivos": int(positives[g]),
+            "alertas": alerts[g].astype(int).tolist(),
+            "precision": _ratio(tp[g], labeled_alerts[g]),
+            "recall": _ratio(tp[g], np.full(tp[g].shape, positives[g])),
+        })
+    return out
@@ -1,9 +1,20 @@
 import os, joblib, numpy as np
 from sklearn.linear_model import LogisticRegression
 MODEL_PATH=os.environ.get("SUPERVISED_PATH","models/model_supervised.pkl")
+MIN_TRAIN_ROWS=30
+def enough_labels(n_rows,n_classes)->bool:
+    """Regla única (batch y /score): sin META suficiente no se usa modelo y el score es 0.5."""
+    return n_rows>=MIN_TRAIN_ROWS and n_classes>=2
 def train_or_load(X,y):
     if os.path.exists(MODEL_PATH): return joblib.load(MODEL_PATH)
     m=LogisticRegression(max_iter=1000); m.fit(X,y)
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True); joblib.dump(m, MODEL_PATH)
     return m
 def predict_proba(m,X): return m.predict_proba(X)[:,1]
+def linear_params(m,dtype=np.float32):
+    """(w,b) de una LogisticRegression binaria, para scorear con np.dot; None si el modelo no es lineal."""
+    if isinstance(m,LogisticRegression) and m.coef_.shape[0]==1:
+        return m.coef_[0].astype(dtype), dtype(m.intercept_[0])
+    return None
+def predict_proba_linear(X,w,b):
+    with np.errstate(over="ignore"): return 1.0/(1.0+np.exp(-(X@w+b)))
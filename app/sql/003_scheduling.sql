@@ -0,0 +1,2 @@
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS tenant TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS priority SMALLINT;
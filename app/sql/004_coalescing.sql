@@ -0,0 +1,5 @@
+-- Cuentas con lecturas nuevas pendientes de recalcular en la próxima pasada MCURVAS coalescida
+CREATE TABLE IF NOT EXISTS dirty_cuentas(
+  cuenta TEXT PRIMARY KEY, marked_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs(status);
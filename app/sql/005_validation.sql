@@ -0,0 +1,3 @@
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS rows_ok BIGINT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS rows_rejected BIGINT;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS rejects_uri TEXT;
@@ -0,0 +1,2 @@
+-- tier_stg_consumo filtra por rango de periodo (mes a mes); sin este índice cada SELECT/DELETE es un full scan
+CREATE INDEX IF NOT EXISTS ix_stg_consumo_periodo ON stg_consumo(periodo);
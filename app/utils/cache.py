@@ -0,0 +1,71 @@
+# app/utils/cache.py
+"""Caché de respuestas JSON en Redis con ETag e invalidación por espacio de nombres.
+
+Cada espacio ("jobs", "kpis") tiene un contador de versión; invalidar = INCR, así las
+claves viejas dejan de leerse al instante y expiran solas por TTL.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Callable
+
+import redis
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from ..config.settings import settings
+
+_client: redis.Redis | None = None
+
+def _redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+    return _client
+
+def _version(r: redis.Redis, ns: str) -> int:
+    v = r.get(f"cache:{ns}:ver")
+    return int(v) if v else 0
+
+def invalidate(*namespaces: str) -> None:
+    """Llamar DESPUÉS del commit que cambia los datos de esos espacios."""
+    try:
+        pipe = _redis().pipeline()
+        for ns in namespaces:
+            pipe.incr(f"cache:{ns}:ver")
+        pipe.execute()
+    except redis.RedisError:
+        pass  # sin Redis solo perdemos caché; el TTL corto acota lo obsoleto
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in inm.split(",")]
+    return "*" in tags or etag in tags
+
+def cached_json(request: Request, ns: str, key: str, ttl: int, build: Callable[[], Any]) -> Response:
+    """Sirve `build()` desde caché (o lo calcula y guarda); responde 304 si el ETag coincide."""
+    body = etag = None
+    try:
+        r = _redis()
+        full = f"cache:{ns}:{_version(r, ns)}:{key}"
+        etag, body = r.hmget(full, "etag", "body")
+        etag = etag.decode() if etag else None
+    except redis.RedisError:
+        r = None
+
+    if body is None:
+        body = json.dumps(jsonable_encoder(build()), separators=(",", ":")).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if r is not None:
+            try:
+                r.pipeline().hset(full, mapping={"etag": etag, "body": body}).expire(full, ttl).execute()
+            except redis.RedisError:
+                pass
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # revalidar siempre; el 304 es casi gratis
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
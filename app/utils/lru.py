@@ -0,0 +1,19 @@
+import threading, time
+from collections import OrderedDict
+class TTLCache:
+    """LRU en memoria del proceso con TTL por entrada; seguro entre hilos."""
+    def __init__(self, maxsize:int, ttl:float):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data:OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or time.monotonic() - hit[0] > self.ttl: return None
+            self._data.move_to_end(key)
+            return hit[1]
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize: self._data.popitem(last=False)
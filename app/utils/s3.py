@@ -1,14 +1,40 @@
 import boto3
 from botocore.client import Config
+from botocore.exceptions import ClientError
 from ..config.settings import settings
-def s3_client():
+def s3_client(public:bool=False):
     if not settings.S3_ENDPOINT: return None
-    return boto3.client("s3", endpoint_url=settings.S3_ENDPOINT,
+    # Las URLs prefirmadas se firman con el host que verá el cliente (p. ej. localhost:9000, no minio:9000)
+    endpoint=(settings.S3_PUBLIC_ENDPOINT or settings.S3_ENDPOINT) if public else settings.S3_ENDPOINT
+    return boto3.client("s3", endpoint_url=endpoint,
         aws_access_key_id=settings.S3_ACCESS_KEY, aws_secret_access_key=settings.S3_SECRET_KEY,
         region_name=settings.S3_REGION, config=Config(signature_version="s3v4"))
 def presign_put(key:str, content_type:str="application/octet-stream", expires:int=3600):
-    cli=s3_client()
+    cli=s3_client(public=True)
     if not cli or not settings.S3_BUCKET: return None
     return cli.generate_presigned_url("put_object",
         Params={"Bucket":settings.S3_BUCKET,"Key":key,"ContentType":content_type}, ExpiresIn=expires)
 def object_uri(key:str)->str: return f"s3://{settings.S3_BUCKET}/{key}"
+def is_s3_uri(uri:str)->bool: return str(uri).startswith("s3://")
+def split_uri(uri:str)->tuple[str,str]:
+    bucket,_,key=uri[len("s3://"):].partition("/")
+    return bucket,key
+def head_object(uri:str):
+    """Metadatos del objeto (ContentLength, ContentType...) o None si no existe."""
+    cli=s3_client(); bucket,key=split_uri(uri)
+    try: return cli.head_object(Bucket=bucket,Key=key)
+    except ClientError: return None
+def open_stream(uri:str, byte_range:str|None=None):
+    """Cuerpo del objeto como stream (botocore StreamingBody), sin copia local."""
+    cli=s3_client(); bucket,key=split_uri(uri)
+    kw={"Range":byte_range} if byte_range else {}
+    return cli.get_object(Bucket=bucket,Key=key,**kw)["Body"]
+def put_bytes(uri:str, data:bytes, content_type:str="application/octet-stream"):
+    cli=s3_client(); bucket,key=split_uri(uri)
+    cli.put_object(Bucket=bucket,Key=key,Body=data,ContentType=content_type)
+def list_uris(prefix_uri:str)->list[str]:
+    """URIs s3:// de todos los objetos bajo el prefijo (pagina list_objects_v2)."""
+    cli=s3_client(); bucket,prefix=split_uri(prefix_uri); out=[]
+    for page in cli.get_paginator("list_objects_v2").paginate(Bucket=bucket,Prefix=prefix):
+        out+=[f"s3://{bucket}/{o['Key']}" for o in page.get("Contents",[])]
+    return out
@@ -1,3 +1,29 @@
 from celery import Celery
+from celery.schedules import crontab
+from kombu import Queue
 from ..config.settings import settings
 celery_app=Celery('fraud_pipeline', broker=settings.REDIS_URL, backend=settings.REDIS_URL, include=['app.workers.tasks'])
+# Una cola por etapa: ingest (I/O), features y scoring (CPU), publish (BD).
+# Cada cola se atiende con su propio worker (-Q/--concurrency/--prefetch-multiplier, ver docker-compose).
+PIPELINE_QUEUES=('ingest','features','scoring','publish')
+celery_app.conf.update(
+    task_queues=[Queue(q) for q in PIPELINE_QUEUES],
+    task_default_queue='ingest',
+    task_routes={
+        'app.workers.tasks.ingest_consumo':{'queue':'ingest'},
+        'app.workers.tasks.mcurvas_prepare':{'queue':'features'},
+        'app.workers.tasks.msupervisado_score':{'queue':'scoring'},
+        'app.workers.tasks.hibridacion':{'queue':'publish'},
+        'app.workers.tasks.predict_publish':{'queue':'publish'},
+        'app.workers.tasks.tier_stg_consumo':{'queue':'ingest'},
+    },
+    # Tiering diario de stg_consumo a Parquet (requiere `celery beat`, ver docker-compose)
+    beat_schedule={
+        'tier-stg-consumo':{'task':'app.workers.tasks.tier_stg_consumo','schedule':crontab(hour=3, minute=0)},
+    },
+    # Prioridades en Redis: 0 = más urgente, 9 = menos urgente
+    task_default_priority=settings.PRIORITY_DEFAULT,
+    broker_transport_options={'priority_steps':list(range(10)),'sep':':','queue_order_strategy':'priority'},
+    # Sin prefetch agresivo: un job grande no debe acaparar mensajes de otros
+    worker_prefetch_multiplier=1,
+)
@@ -0,0 +1,58 @@
+# app/workers/scheduling.py
+"""Prioridad de jobs por tamaño de archivo, reparto justo (fair-share) entre tenants y ventana de coalescencia."""
+from __future__ import annotations
+
+import redis
+
+from ..config.settings import settings
+
+PRIORITY_MIN, PRIORITY_MAX = 0, 9  # Convención Celery+Redis: 0 = más urgente
+_INFLIGHT_KEY = "fairshare:inflight"
+_INFLIGHT_TTL = 24 * 3600
+_COALESCE_KEY = "coalesce:mcurvas:pending"
+
+def _redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+def _clamp(p: int) -> int:
+    return max(PRIORITY_MIN, min(PRIORITY_MAX, int(p)))
+
+def size_priority(size_bytes: int) -> int:
+    """Archivos pequeños → prioridad alta; grandes → baja (interpolación lineal entre umbrales)."""
+    lo, hi = settings.PRIORITY_SMALL_BYTES, settings.PRIORITY_LARGE_BYTES
+    if size_bytes <= lo:
+        return PRIORITY_MIN
+    if size_bytes >= hi:
+        return PRIORITY_MAX - 1  # 9 queda para el castigo fair-share
+    frac = (size_bytes - lo) / float(hi - lo)
+    return _clamp(1 + round(frac * (PRIORITY_MAX - 3)))
+
+def tenant_inflight(tenant: str) -> int:
+    v = _redis().hget(_INFLIGHT_KEY, tenant)
+    return int(v) if v else 0
+
+def job_priority(size_bytes: int, tenant: str, explicit: int | None = None) -> int:
+    """Prioridad final = explícita (o por tamaño) + castigo por jobs en curso del mismo tenant."""
+    base = explicit if explicit is not None else size_priority(size_bytes)
+    penalty = min(tenant_inflight(tenant), settings.FAIRSHARE_MAX_PENALTY)
+    return _clamp(base + penalty)
+
+def acquire(tenant: str) -> None:
+    r = _redis()
+    r.hincrby(_INFLIGHT_KEY, tenant, 1)
+    r.expire(_INFLIGHT_KEY, _INFLIGHT_TTL)
+
+def release(tenant: str | None) -> None:
+    if not tenant:
+        return
+    r = _redis()
+    if r.hincrby(_INFLIGHT_KEY, tenant, -1) <= 0:
+        r.hdel(_INFLIGHT_KEY, tenant)
+
+def open_coalesce_window() -> bool:
+    """True solo para la primera ingesta de la ventana: esa agenda la pasada MCURVAS (countdown = ventana).
+
+    La clave expira con la ventana, así que una ingesta que no la abre ya está
+    commiteada antes de que la pasada reclame los jobs en espera.
+    """
+    return bool(_redis().set(_COALESCE_KEY, 1, nx=True, ex=settings.COALESCE_WINDOW_SECS))
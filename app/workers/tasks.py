@@ -1,16 +1,26 @@
 # app/workers/tasks.py
 from __future__ import annotations
 
+import codecs
+import io
 import os
 import uuid
 import numpy as np
 import pandas as pd
 
+from celery.signals import task_failure
 from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from .celery_app import celery_app
+from ..config.settings import settings
 from ..db import get_engine
-from ..utils.benford import benford_pval
-from ..models.supervised import train_or_load, predict_proba
+from ..models.features import curvas_features
+from ..models.supervised import enough_labels, train_or_load, predict_proba, linear_params, predict_proba_linear
+from ..utils.s3 import is_s3_uri, open_stream
+from ..utils.cache import invalidate
+from ..utils import archive
+from . import scheduling
+from .validation import RejectLimitExceeded, reject_ratio, validate_consumo
 
 # ------------------------- Helpers comunes -------------------------
 
@@ -29,43 +39,49 @@ _ATTR_CANON = {
     "TRAFO": ["TRAFO", "TRANSFORMADOR", "ID_TRAFO", "COD_TRAFO", "CODIGO TRAFO", "CODIGO_TRAFO"],
 }
 
-def _read_table(file_path: str) -> pd.DataFrame:
-    """Lee XLSX o CSV autodetectando separador y codificación."""
-    if file_path.lower().endswith((".xls", ".xlsx")):
-        df = pd.read_excel(file_path)
-    else:
-        # Autodetecta sep y fallback de encoding
-        for enc in ("utf-8", "latin-1"):
-            try:
-                df = pd.read_csv(file_path, sep=None, engine="python", encoding=enc)
-                break
-            except UnicodeDecodeError:
-                continue
-        else:
-            df = pd.read_csv(file_path, sep=None, engine="python")
-    # Normaliza encabezados a MAYÚSCULAS sin espacios extremos
-    df.columns = [str(c).strip().upper() for c in df.columns]
-    return df
+def _latin1_fallback(err: UnicodeDecodeError):
+    """Byte no-UTF-8 más allá de la muestra inicial: se decodifica como latin-1 en vez de abortar la ingesta."""
+    return bytes(err.object[err.start:err.end]).decode("latin-1"), err.end
 
-def _to_float(s: object) -> float | None:
-    """Convierte string con punto/coma y separadores de miles a float."""
-    if pd.isna(s):
-        return None
-    x = str(s).strip().replace(" ", "")
-    # Heurística miles/decimales (ES/US)
-    if x.count(",") > 0 and x.count(".") > 0:
-        if x.rfind(",") > x.rfind("."):
-            # decimal = coma → remove thousands dots
-            x = x.replace(".", "").replace(",", ".")
-        else:
-            # decimal = punto → remove thousands commas
-            x = x.replace(",", "")
-    else:
-        x = x.replace(",", ".")
+codecs.register_error("latin1_fallback", _latin1_fallback)
+
+def _sniff_encoding(head: bytes) -> str:
+    """UTF-8 si la muestra inicial decodifica limpio; si no, latin-1."""
     try:
-        return float(x)
-    except Exception:
-        return None
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+def _open_binary(file_path: str, head_bytes: int = 65536):
+    """Devuelve (stream binario, muestra inicial). Para s3:// lee directo del objeto, sin copia local."""
+    if is_s3_uri(file_path):
+        head = open_stream(file_path, f"bytes=0-{head_bytes - 1}").read()
+        return open_stream(file_path), head
+    f = open(file_path, "rb")
+    head = f.read(head_bytes)
+    f.seek(0)
+    return f, head
+
+def _iter_tables(file_path: str, chunksize: int | None = None):
+    """Lee XLSX o CSV (local o s3://) por bloques, autodetectando separador y codificación."""
+    chunksize = chunksize or settings.INGEST_CHUNK_ROWS
+    raw, head = _open_binary(file_path)
+    try:
+        if file_path.lower().endswith((".xls", ".xlsx")):
+            # Excel requiere acceso aleatorio: se carga en memoria (nunca a disco)
+            frames = [pd.read_excel(io.BytesIO(raw.read()))]
+        else:
+            # UTF-8 con fallback por byte: un archivo latin-1 cuyo primer acento cae después de la
+            # muestra de 64 KB se lee igual (antes se reintentaba el archivo completo como latin-1)
+            stream = io.TextIOWrapper(raw, encoding=_sniff_encoding(head), errors="latin1_fallback", newline="")
+            frames = pd.read_csv(stream, sep=None, engine="python", chunksize=chunksize)
+        for df in frames:
+            # Normaliza encabezados a MAYÚSCULAS sin espacios extremos
+            df.columns = [str(c).strip().upper() for c in df.columns]
+            yield df
+    finally:
+        raw.close()
 
 def _parse_period_header(h: str) -> str | None:
     """Intenta parsear un nombre de columna que represente periodo (mensual) a 'YYYY-MM-01'."""
@@ -138,181 +154,291 @@ def _longify_if_wide(df: pd.DataFrame) -> pd.DataFrame:
         return df
 
     keep_attrs = list(attrib_cols.values())
-    m = df[[id_col] + keep_attrs + period_cols].melt(
-        id_vars=[id_col] + keep_attrs,
+    # melt reinicia el índice: la fila de origen viaja como id var para que el reporte de rechazos
+    # (FILA = índice) apunte a la fila del archivo y no a la posición dentro del bloque
+    m = df[[id_col] + keep_attrs + period_cols].assign(_FILA=df.index).melt(
+        id_vars=["_FILA", id_col] + keep_attrs,
         value_vars=period_cols,
         var_name="PERIODO_RAW",
         value_name="KWH"
     )
     m["PERIODO"] = m["PERIODO_RAW"].map(period_map)
-    m["KWH"] = m["KWH"].apply(_to_float)
-    m["CUENTA"] = m[id_col].astype(str).str.strip()
-    m["PERIODO"] = pd.to_datetime(m["PERIODO"], errors="coerce").dt.date
-    m = m.dropna(subset=["PERIODO", "KWH"])
+    m["CUENTA"] = m[id_col].astype("string").str.strip()
+    # Celda vacía = mes sin lectura, no es un error. Todo valor presente (aunque sea inválido)
+    # pasa crudo a validate_consumo, que lo tipa o lo rechaza con motivo; tampoco se suman duplicados.
+    kwh_txt = m["KWH"].astype("string").str.strip()
+    m = m[kwh_txt.notna() & (kwh_txt != "")].set_index("_FILA").rename_axis(None)
 
     out = m[["CUENTA", "PERIODO", "KWH"]].copy()
-    out["LATITUD"]  = m[attrib_cols["LATITUD"]].apply(_to_float) if "LATITUD" in attrib_cols else np.nan
-    out["LONGITUD"] = m[attrib_cols["LONGITUD"]].apply(_to_float) if "LONGITUD" in attrib_cols else np.nan
+    out["LATITUD"]  = m[attrib_cols["LATITUD"]] if "LATITUD" in attrib_cols else np.nan
+    out["LONGITUD"] = m[attrib_cols["LONGITUD"]] if "LONGITUD" in attrib_cols else np.nan
     for key in ["TIPO_USUARIO", "ESTRATO", "TIPO_POBLACION", "FPAS", "TRAFO"]:
-        out[key] = m[attrib_cols[key]].astype(str).str.strip() if key in attrib_cols else np.nan
-
-    agg = {
-        "KWH": "sum",
-        "LATITUD": "first", "LONGITUD": "first", "TIPO_USUARIO": "first", "ESTRATO": "first",
-        "TIPO_POBLACION": "first", "FPAS": "first", "TRAFO": "first",
-    }
-    out2 = out.groupby(["CUENTA", "PERIODO"], as_index=False).agg(agg)
-    return out2
+        out[key] = m[attrib_cols[key]].astype("string").str.strip() if key in attrib_cols else np.nan
+    return out
 
 # ------------------------- Tareas del pipeline -------------------------
 
-@celery_app.task
-def ingest_consumo(job_id: str, file_path: str):
-    """Ingesta a stg_consumo; detecta ancho→largo; upsert y lanza MCURVAS."""
-    eng = get_engine()
-    df = _read_table(file_path)
+_MCURVAS_LOCK = 0x4D435256  # pg_advisory_lock: una sola pasada MCURVAS a la vez
+
+def _forward(current, task, *args, **opts):
+    """Encola la siguiente etapa conservando la prioridad del mensaje actual."""
+    prio = (current.request.delivery_info or {}).get("priority")
+    return task.apply_async(args, priority=prio, **opts)
+
+def _job_uuids(job_ids: list[str]) -> list[uuid.UUID]:
+    return [uuid.UUID(j) for j in job_ids]
+
+_JOB_TASKS = {f"app.workers.tasks.{n}" for n in ("ingest_consumo", "msupervisado_score", "hibridacion", "predict_publish")}
+
+@task_failure.connect
+def _on_pipeline_failure(sender=None, args=None, **_):
+    """Job(s) con una etapa fallida: status 'failed' y se libera su cupo fair-share.
+
+    Sin esto el contador del tenant quedaría incrementado y, como cada `acquire` renueva
+    el TTL, el castigo de prioridad sería permanente para un tenant activo.
+    """
+    if sender is None:
+        return
+    if sender.name == "app.workers.tasks.mcurvas_prepare":
+        # Pasada sin reintentos restantes: fallan los jobs que esperaban al menos una ventana completa
+        # (los más nuevos tienen su propia pasada agendada)
+        with get_engine().begin() as con:
+            tenants = con.execute(text("""
+                UPDATE jobs SET status='failed'
+                WHERE status='waiting_features' AND updated_at <= now() - make_interval(secs => :w)
+                RETURNING tenant
+            """), {"w": settings.COALESCE_WINDOW_SECS}).scalars().all()
+    elif sender.name in _JOB_TASKS and args:
+        job_ids = args[0] if isinstance(args[0], list) else [args[0]]
+        with get_engine().begin() as con:
+            tenants = con.execute(text("""
+                UPDATE jobs SET status='failed'
+                WHERE job_id = ANY(:js) AND status NOT IN ('done', 'rejected', 'failed')
+                RETURNING tenant
+            """), {"js": _job_uuids(job_ids)}).scalars().all()
+    else:
+        return
+    invalidate("jobs")
+    for tenant in tenants:
+        scheduling.release(tenant)
 
+def _prepare_consumo(df: pd.DataFrame) -> pd.DataFrame:
+    """Detecta ancho→largo y completa columnas opcionales de un bloque (el tipado lo hace la validación)."""
     req = {"CUENTA", "PERIODO", "KWH"}
     if not req.issubset(df.columns):
         df = _longify_if_wide(df)
         if not req.issubset(df.columns):
             raise ValueError("El archivo no contiene columnas requeridas CUENTA, PERIODO, KWH (ni formato ancho detectable)." )
 
-    df["PERIODO"] = pd.to_datetime(df["PERIODO"], errors="coerce").dt.date
-    df["KWH"] = pd.to_numeric(df["KWH"], errors="coerce")
-    df = df.dropna(subset=["CUENTA", "PERIODO", "KWH"])
-
-    with eng.begin() as con:
-        con.execute(text("UPDATE jobs SET status='ingesting' WHERE job_id=:j"), {"j": uuid.UUID(job_id)})
-        ins = text("""
-        INSERT INTO stg_consumo
-          (cuenta, periodo, kwh, latitud, longitud, tipo_usuario, estrato, tipo_poblacion, fpas, trafo, source_file)
-        VALUES
-          (:CUENTA, :PERIODO, :KWH, :LATITUD, :LONGITUD, :TIPO_USUARIO, :ESTRATO, :TIPO_POBLACION, :FPAS, :TRAFO, :SOURCE_FILE)
-        ON CONFLICT (cuenta,periodo) DO UPDATE
-          SET kwh=EXCLUDED.kwh,
-              latitud=COALESCE(EXCLUDED.latitud, stg_consumo.latitud),
-              longitud=COALESCE(EXCLUDED.longitud, stg_consumo.longitud),
-              tipo_usuario=COALESCE(EXCLUDED.tipo_usuario, stg_consumo.tipo_usuario),
-              estrato=COALESCE(EXCLUDED.estrato, stg_consumo.estrato),
-              tipo_poblacion=COALESCE(EXCLUDED.tipo_poblacion, stg_consumo.tipo_poblacion),
-              fpas=COALESCE(EXCLUDED.fpas, stg_consumo.fpas),
-              trafo=COALESCE(EXCLUDED.trafo, stg_consumo.trafo)
-        """)
-        for opt in ["LATITUD","LONGITUD","TIPO_USUARIO","ESTRATO","TIPO_POBLACION","FPAS","TRAFO"]:
-            if opt not in df.columns:
-                df[opt] = np.nan
-        for rec in df.to_dict("records"):
-            rec["SOURCE_FILE"] = os.path.basename(file_path)
-            con.execute(ins, rec)
-
-    mcurvas_prepare.delay(job_id)
-    return {"rows": int(len(df))}
+    for opt in ["LATITUD","LONGITUD","TIPO_USUARIO","ESTRATO","TIPO_POBLACION","FPAS","TRAFO"]:
+        if opt not in df.columns:
+            df[opt] = np.nan
+    return df
 
-@celery_app.task
-def mcurvas_prepare(job_id: str):
-    """Calcula features de curvas y las guarda en features_curvas."""
+@celery_app.task(bind=True)
+def ingest_consumo(self, job_id: str, file_path: str):
+    """Ingesta a stg_consumo por bloques (local o s3://) con validación; marca cuentas sucias y agenda MCURVAS."""
     eng = get_engine()
-    with eng.begin() as con:
-        con.execute(text("UPDATE jobs SET status='mcurvas' WHERE job_id=:j"), {"j": uuid.UUID(job_id)})
-        df = pd.read_sql(text("SELECT cuenta, periodo, kwh FROM stg_consumo"), con)
-
-    if df.empty:
-        msupervisado_score.delay(job_id)
-        return {"features": 0}
-
-    df = df.sort_values(["CUENTA", "PERIODO"])
-    last12 = df.groupby("CUENTA").tail(12)
-
-    piv = last12.pivot_table(index="CUENTA", columns="PERIODO", values="KWH", aggfunc="last").sort_index(axis=1)
-    piv = piv.fillna(0.0)
-    arr = piv.to_numpy()
-
-    if arr.shape[1] >= 6:
-        prom_6 = arr[:, -6:].mean(axis=1)
-        sample_for_benford = [row[-6:] for row in arr]
-    else:
-        prom_6 = arr.mean(axis=1)
-        sample_for_benford = [row for row in arr]
-
-    std_12 = arr.std(axis=1, ddof=0)
-    cv = std_12 / (prom_6 + 1e-6)
-    ben = [benford_pval(sample) for sample in sample_for_benford]
-
-    out = pd.DataFrame({
-        "cuenta": piv.index,
-        "prom_6": prom_6,
-        "std_12": std_12,
-        "cv": cv,
-        "benford_pval": ben
-    })
-
-    with eng.begin() as con:
-        up = text("""
-        INSERT INTO features_curvas (cuenta, prom_6, std_12, cv, benford_pval)
-        VALUES (:cuenta, :prom_6, :std_12, :cv, :benford_pval)
-        ON CONFLICT (cuenta) DO UPDATE
-           SET prom_6=EXCLUDED.prom_6,
-               std_12=EXCLUDED.std_12,
-               cv=EXCLUDED.cv,
-               benford_pval=EXCLUDED.benford_pval,
-               computed_at=now()
-        """)
-        for _, r in out.iterrows():
-            con.execute(up, r.to_dict())
-
-    msupervisado_score.delay(job_id)
-    return {"features": int(len(out))}
+    jid = uuid.UUID(job_id)
+    source_file = os.path.basename(file_path)
+    rows, rejected, seen = 0, [], np.empty(0, dtype=np.uint64)
+    rejects_uri = f"{settings.REJECTS_ROOT.rstrip('/')}/{job_id}.parquet"
+
+    ins = text("""
+    INSERT INTO stg_consumo
+      (cuenta, periodo, kwh, latitud, longitud, tipo_usuario, estrato, tipo_poblacion, fpas, trafo, source_file)
+    VALUES
+      (:CUENTA, :PERIODO, :KWH, :LATITUD, :LONGITUD, :TIPO_USUARIO, :ESTRATO, :TIPO_POBLACION, :FPAS, :TRAFO, :SOURCE_FILE)
+    ON CONFLICT (cuenta,periodo) DO UPDATE
+      SET kwh=EXCLUDED.kwh,
+          latitud=COALESCE(EXCLUDED.latitud, stg_consumo.latitud),
+          longitud=COALESCE(EXCLUDED.longitud, stg_consumo.longitud),
+          tipo_usuario=COALESCE(EXCLUDED.tipo_usuario, stg_consumo.tipo_usuario),
+          estrato=COALESCE(EXCLUDED.estrato, stg_consumo.estrato),
+          tipo_poblacion=COALESCE(EXCLUDED.tipo_poblacion, stg_consumo.tipo_poblacion),
+          fpas=COALESCE(EXCLUDED.fpas, stg_consumo.fpas),
+          trafo=COALESCE(EXCLUDED.trafo, stg_consumo.trafo)
+    """)
+    dirty = text("INSERT INTO dirty_cuentas (cuenta) VALUES (:c) ON CONFLICT DO NOTHING")
+    done = text("""
+        UPDATE jobs SET status=:s, rows_ok=:ok, rows_rejected=:bad, rejects_uri=:u WHERE job_id=:j RETURNING tenant
+    """)
 
-@celery_app.task
-def msupervisado_score(job_id: str):
-    """Entrena/usa modelo supervisado y envía registros a hibridación."""
+    try:
+        with eng.begin() as con:
+            con.execute(text("UPDATE jobs SET status='ingesting' WHERE job_id=:j"), {"j": jid})
+            for chunk in _iter_tables(file_path):
+                df, bad, seen = validate_consumo(_prepare_consumo(chunk), seen)
+                if len(bad):
+                    rejected.append(bad)
+                for rec in df.to_dict("records"):
+                    rec["SOURCE_FILE"] = source_file
+                    con.execute(ins, rec)
+                if len(df):
+                    con.execute(dirty, [{"c": c} for c in df["CUENTA"].unique()])
+                rows += len(df)
+
+            n_bad = sum(len(r) for r in rejected)
+            if rejected:
+                # Reporte Parquet de rechazos (fila, valores crudos, motivos) enlazado desde el job
+                archive.write_parquet(pd.concat(rejected, ignore_index=True), rejects_uri)
+            if reject_ratio(rows, n_bad) > settings.VALIDATION_MAX_REJECT_RATIO:
+                raise RejectLimitExceeded()  # rollback: nada del archivo queda en stg_consumo
+            con.execute(done, {"s": "waiting_features", "ok": rows, "bad": n_bad,
+                               "u": rejects_uri if rejected else None, "j": jid})
+    except RejectLimitExceeded:
+        with eng.begin() as con:
+            tenant = con.execute(done, {"s": "rejected", "ok": 0, "bad": n_bad, "u": rejects_uri, "j": jid}).scalar()
+        invalidate("jobs")
+        scheduling.release(tenant)
+        return {"rows": 0, "rejected": int(n_bad), "status": "rejected"}
+    invalidate("jobs", "kpis")  # estado del job y atributos de cuenta (vw_cuenta_attrs)
+
+    # Tras el commit: la primera ingesta de la ventana agenda la pasada; las demás se suman a ella
+    if scheduling.open_coalesce_window():
+        _forward(self, mcurvas_prepare, countdown=settings.COALESCE_WINDOW_SECS)
+    return {"rows": int(rows), "rejected": int(n_bad)}
+
+# Errores de BD: la transacción devuelve jobs/cuentas a la cola y la pasada se reintenta sola,
+# sin esperar a que otra ingesta abra una ventana nueva
+@celery_app.task(bind=True, autoretry_for=(DBAPIError,), retry_backoff=True, retry_backoff_max=600, max_retries=8)
+def mcurvas_prepare(self):
+    """Pasada MCURVAS coalescida: recalcula solo las cuentas sucias y atiende a todos los jobs en espera."""
+    eng = get_engine()
+    with eng.connect() as lock_con:
+        if not lock_con.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _MCURVAS_LOCK}).scalar():
+            raise self.retry(countdown=settings.COALESCE_WINDOW_SECS, max_retries=None)
+        try:
+            # Reclamo + cálculo + upsert en una transacción: si falla, jobs y cuentas sucias vuelven a la cola
+            with eng.begin() as con:
+                job_ids = [str(j) for j in con.execute(text(
+                    "UPDATE jobs SET status='mcurvas' WHERE status='waiting_features' RETURNING job_id"
+                )).scalars()]
+                if not job_ids:
+                    return {"jobs": 0, "features": 0}
+                cuentas = con.execute(text("DELETE FROM dirty_cuentas RETURNING cuenta")).scalars().all()
+
+                df = pd.read_sql(text("""
+                    SELECT cuenta, periodo, kwh FROM stg_consumo WHERE cuenta = ANY(:c)
+                """), con, params={"c": list(cuentas)})
+                out = curvas_features(df)
+
+                up = text("""
+                INSERT INTO features_curvas (cuenta, prom_6, std_12, cv, benford_pval)
+                VALUES (:cuenta, :prom_6, :std_12, :cv, :benford_pval)
+                ON CONFLICT (cuenta) DO UPDATE
+                   SET prom_6=EXCLUDED.prom_6,
+                       std_12=EXCLUDED.std_12,
+                       cv=EXCLUDED.cv,
+                       benford_pval=EXCLUDED.benford_pval,
+                       computed_at=now()
+                """)
+                for _, r in out.iterrows():
+                    con.execute(up, r.to_dict())
+        finally:
+            lock_con.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _MCURVAS_LOCK})
+    invalidate("jobs")
+
+    _forward(self, msupervisado_score, job_ids)
+    return {"jobs": len(job_ids), "features": int(len(out))}
+
+def _score_chunked(eng, job_id: uuid.UUID, model) -> int:
+    """Scorea features_curvas por bloques float32 desde un cursor server-side y escribe cada bloque en resultados.
+
+    La memoria queda acotada a SCORING_CHUNK_ROWS filas; la regresión logística se evalúa como
+    sigmoid(X·w + b) con NumPy. El umbral lo aplica hibridación en SQL sobre lo ya escrito.
+    """
+    params = linear_params(model) if model is not None else None
+    up = text("""
+        INSERT INTO resultados (job_id, cuenta, score_supervisado) VALUES (:job, :cuenta, :ss)
+        ON CONFLICT (job_id, cuenta) DO UPDATE SET score_supervisado=EXCLUDED.score_supervisado
+    """)
+    n = 0
+    with eng.connect().execution_options(stream_results=True, yield_per=settings.SCORING_CHUNK_ROWS) as src, \
+         eng.begin() as dst:
+        # float4 en SQL: evita decodificar NUMERIC a Decimal/float64 fila a fila
+        res = src.execute(text("""
+            SELECT cuenta, COALESCE(prom_6,0)::float4, COALESCE(std_12,0)::float4,
+                   COALESCE(cv,0)::float4, COALESCE(benford_pval,0)::float4
+            FROM features_curvas
+        """))
+        for part in res.partitions():
+            X = np.array([r[1:] for r in part], dtype=np.float32)
+            if params is not None:
+                score_sup = predict_proba_linear(X, *params)
+            elif model is not None:
+                score_sup = predict_proba(model, X)
+            else:
+                score_sup = np.full((X.shape[0],), 0.5, dtype=np.float32)
+            dst.execute(up, [{"job": job_id, "cuenta": r[0], "ss": float(v)} for r, v in zip(part, score_sup)])
+            n += len(part)
+    return n
+
+@celery_app.task(bind=True)
+def msupervisado_score(self, job_ids: list[str]):
+    """Entrena/usa modelo supervisado una vez para todos los jobs de la pasada y envía a hibridación."""
     eng = get_engine()
     with eng.begin() as con:
-        con.execute(text("UPDATE jobs SET status='msupervisado' WHERE job_id=:j"), {"j": uuid.UUID(job_id)})
+        con.execute(text("UPDATE jobs SET status='msupervisado' WHERE job_id = ANY(:js)"), {"js": _job_uuids(job_ids)})
         train_df = pd.read_sql(text("""
             SELECT f.cuenta, f.prom_6, f.std_12, f.cv, f.benford_pval, m.efectiva::int AS y
             FROM features_curvas f
             JOIN meta_fraude m USING(cuenta)
         """), con)
+    invalidate("jobs")
+
+    model = None
+    if enough_labels(len(train_df), train_df["y"].nunique()):
+        X = train_df[["prom_6", "std_12", "cv", "benford_pval"]].fillna(0.0).to_numpy()
+        y = train_df["y"].to_numpy()
+        model = train_or_load(X, y)
+
+    if settings.SCORING_MODE == "chunked":
+        n = _score_chunked(eng, uuid.UUID(job_ids[0]), model)
+        _forward(self, hibridacion, job_ids, None)
+        return {"scored": n}
+
+    with eng.connect() as con:
         X_all = pd.read_sql(text("""
             SELECT f.cuenta, f.prom_6, f.std_12, f.cv, f.benford_pval
             FROM features_curvas f
         """), con)
 
     if X_all.empty:
-        hibridacion.delay(job_id, [])
+        _forward(self, hibridacion, job_ids, [])
         return {"scored": 0}
 
-    if len(train_df) < 30 or train_df["y"].nunique() < 2:
-        X = X_all[["prom_6", "std_12", "cv", "benford_pval"]].fillna(0.0).to_numpy()
-        score_sup = np.full((X.shape[0],), 0.5)
+    if model is None:
+        score_sup = np.full((len(X_all),), 0.5)
     else:
-        X = train_df[["prom_6", "std_12", "cv", "benford_pval"]].fillna(0.0).to_numpy()
-        y = train_df["y"].to_numpy()
-        model = train_or_load(X, y)
         Xp = X_all[["prom_6", "std_12", "cv", "benford_pval"]].fillna(0.0).to_numpy()
         score_sup = predict_proba(model, Xp)
 
     X_all["score_supervisado"] = score_sup
     recs = X_all[["cuenta", "score_supervisado"]].to_dict("records")
-    hibridacion.delay(job_id, recs)
+    _forward(self, hibridacion, job_ids, recs)
     return {"scored": int(len(X_all))}
 
-@celery_app.task
-def hibridacion(job_id: str, supervised_records: list[dict]):
-    """Aplica umbral activo y persiste en resultados."""
+@celery_app.task(bind=True)
+def hibridacion(self, job_ids: list[str], supervised_records: list[dict] | None):
+    """Aplica umbral activo, persiste en resultados del primer job y replica a los demás de la pasada.
+
+    Con `supervised_records=None` (SCORING_MODE=chunked) los scores ya están en resultados del
+    primer job y el umbral se aplica con un UPDATE, sin traer filas al worker.
+    """
     eng = get_engine()
+    lead, followers = job_ids[0], job_ids[1:]
     with eng.begin() as con:
-        con.execute(text("UPDATE jobs SET status='hibridacion' WHERE job_id=:j"), {"j": uuid.UUID(job_id)})
+        con.execute(text("UPDATE jobs SET status='hibridacion' WHERE job_id = ANY(:js)"), {"js": _job_uuids(job_ids)})
         row = con.execute(text("SELECT model_name, model_version, threshold FROM vw_active_models LIMIT 1")).mappings().first()
+    invalidate("jobs")
 
     model_name = row["model_name"] if row else "hybrid_default"
     model_version = row["model_version"] if row else "1.0.0"
     thr = float(row["threshold"]) if (row and row["threshold"] is not None) else 0.60
 
     out = []
-    for r in supervised_records:
+    for r in supervised_records or []:
         cuenta = r["cuenta"]
         s_sup = float(r["score_supervisado"])
         s_cur = None
@@ -320,12 +446,7 @@ def hibridacion(job_id: str, supervised_records: list[dict]):
         dec = s_h >= thr
         out.append((cuenta, s_sup, s_cur, s_h, thr, dec, model_name, model_version))
 
-    with eng.begin() as con:
-        ins = text("""
-        INSERT INTO resultados
-          (job_id, cuenta, score_supervisado, score_curvas, score_hibrido, umbral_aplicado, decision, model_name, model_version)
-        VALUES
-          (:job, :cuenta, :ss, :sc, :sh, :thr, :dec, :mname, :mver)
+    on_conflict = """
         ON CONFLICT (job_id, cuenta) DO UPDATE
            SET score_supervisado=EXCLUDED.score_supervisado,
                score_curvas=EXCLUDED.score_curvas,
@@ -334,10 +455,24 @@ def hibridacion(job_id: str, supervised_records: list[dict]):
                decision=EXCLUDED.decision,
                model_name=EXCLUDED.model_name,
                model_version=EXCLUDED.model_version
-        """)
+        """
+    with eng.begin() as con:
+        if supervised_records is None:
+            n_rows = con.execute(text("""
+                UPDATE resultados
+                   SET score_curvas=NULL, score_hibrido=score_supervisado, umbral_aplicado=:thr,
+                       decision=(score_supervisado >= :thr), model_name=:mname, model_version=:mver
+                 WHERE job_id=:lead
+            """), {"thr": thr, "mname": model_name, "mver": model_version, "lead": uuid.UUID(lead)}).rowcount
+        ins = text("""
+        INSERT INTO resultados
+          (job_id, cuenta, score_supervisado, score_curvas, score_hibrido, umbral_aplicado, decision, model_name, model_version)
+        VALUES
+          (:job, :cuenta, :ss, :sc, :sh, :thr, :dec, :mname, :mver)
+        """ + on_conflict)
         for (cuenta, s_sup, s_cur, s_h, t, dec, mname, mver) in out:
             con.execute(ins, {
-                "job": uuid.UUID(job_id),
+                "job": uuid.UUID(lead),
                 "cuenta": cuenta,
                 "ss": s_sup,
                 "sc": s_cur,
@@ -347,13 +482,72 @@ def hibridacion(job_id: str, supervised_records: list[dict]):
                 "mname": mname,
                 "mver": mver
             })
+        # Fan-out: los demás jobs de la pasada reciben una copia server-side (sin reenviar filas)
+        if followers:
+            con.execute(text("""
+            INSERT INTO resultados
+              (job_id, cuenta, score_supervisado, score_curvas, score_hibrido, umbral_aplicado, decision, model_name, model_version)
+            SELECT f.job_id, r.cuenta, r.score_supervisado, r.score_curvas, r.score_hibrido, r.umbral_aplicado,
+                   r.decision, r.model_name, r.model_version
+            FROM resultados r CROSS JOIN unnest(CAST(:fs AS uuid[])) AS f(job_id)
+            WHERE r.job_id=:lead
+            """ + on_conflict), {"fs": _job_uuids(followers), "lead": uuid.UUID(lead)})
+    invalidate("kpis")
+
+    _forward(self, predict_publish, job_ids)
+    return {"hybrid_rows": int(n_rows if supervised_records is None else len(out)), "jobs": len(job_ids)}
+
+@celery_app.task(bind=True)
+def predict_publish(self, job_ids: list[str]):
+    eng = get_engine()
+    with eng.begin() as con:
+        tenants = con.execute(text("UPDATE jobs SET status='done' WHERE job_id = ANY(:js) RETURNING tenant"),
+                              {"js": _job_uuids(job_ids)}).scalars().all()
+    invalidate("jobs", "kpis")
+    for tenant in tenants:
+        scheduling.release(tenant)
+    return {"status": "done", "jobs": len(job_ids)}
 
-    predict_publish.delay(job_id)
-    return {"hybrid_rows": int(len(out))}
+# ------------------------- Mantenimiento -------------------------
 
 @celery_app.task
-def predict_publish(job_id: str):
+def tier_stg_consumo(horizon_months: int | None = None):
+    """Mueve a Parquet (year/month) los periodos más viejos que el horizonte y los borra de stg_consumo.
+
+    MCURVAS solo usa los últimos 12 periodos por cuenta, así que el horizonte no puede ser menor.
+    Cada mes se borra y archiva en su propia transacción: si falla la escritura, el borrado se revierte.
+    """
+    horizon = horizon_months or settings.TIER_HORIZON_MONTHS
+    if horizon < 12:
+        raise ValueError("TIER_HORIZON_MONTHS debe ser >= 12 (MCURVAS usa los últimos 12 periodos).")
+    today = pd.Timestamp.today()
+    cutoff = (pd.Timestamp(today.year, today.month, 1) - pd.DateOffset(months=horizon)).date()
+
     eng = get_engine()
-    with eng.begin() as con:
-        con.execute(text("UPDATE jobs SET status='done' WHERE job_id=:j"), {"j": uuid.UUID(job_id)})
-    return {"status": "done"}
+    with eng.connect() as con:
+        months = con.execute(text("""
+            SELECT DISTINCT date_trunc('month', periodo)::date FROM stg_consumo WHERE periodo < :cut ORDER BY 1
+        """), {"cut": cutoff}).scalars().all()
+
+    moved = 0
+    for month in months:
+        nxt = (pd.Timestamp(month) + pd.DateOffset(months=1)).date()
+        rng = {"d": month, "h": nxt}
+        # DELETE … RETURNING en un solo snapshot: se archivan exactamente las filas borradas, aunque
+        # una ingesta (backfill) escriba en el mismo mes mientras tanto
+        with eng.connect().execution_options(isolation_level="REPEATABLE READ") as con, con.begin():
+            res = con.execute(text(f"""
+                DELETE FROM stg_consumo WHERE periodo >= :d AND periodo < :h
+                RETURNING {", ".join(archive.COLUMNS)}
+            """), rng)
+            df = pd.DataFrame(res.fetchall(), columns=list(res.keys()))
+            if df.empty:
+                continue
+            archive.write_partition(df, archive.partition_uri(month))
+        moved += len(df)
+
+    if moved:
+        # Recupera el espacio de filas e índice para que el upsert de ingesta trabaje sobre la tabla chica
+        with eng.connect().execution_options(isolation_level="AUTOCOMMIT") as con:
+            con.exec_driver_sql("VACUUM (ANALYZE) stg_consumo")
+    return {"cutoff": str(cutoff), "months": len(months), "rows": moved}
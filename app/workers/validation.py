@@ -0,0 +1,92 @@
+# app/workers/validation.py
+"""Validación vectorizada de bloques de consumo: todas las reglas en una pasada y motivo por fila rechazada."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from ..config.settings import settings
+
+REPORT_COLUMNS = ["FILA", "CUENTA", "PERIODO", "KWH", "LATITUD", "LONGITUD", "MOTIVOS"]
+
+class RejectLimitExceeded(Exception):
+    """El archivo supera VALIDATION_MAX_REJECT_RATIO: no se publica nada y el pipeline se corta."""
+
+def _bbox() -> tuple[float, float, float, float]:
+    lat_min, lat_max, lon_min, lon_max = (float(v) for v in settings.VALIDATION_BBOX.split(","))
+    return lat_min, lat_max, lon_min, lon_max
+
+def parse_number(col: pd.Series) -> pd.Series:
+    """Números con coma o punto decimal y separadores de miles (ES/US), vectorizado; inválidos → NaN."""
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float)
+    x = col.astype("string").str.strip().str.replace(" ", "", regex=False)
+    has_comma, has_dot = x.str.contains(",", regex=False), x.str.contains(".", regex=False)
+    comma_decimal = has_comma & has_dot & (x.str.rfind(",") > x.str.rfind("."))
+    dot_decimal = has_comma & has_dot & ~comma_decimal
+    x = x.mask(comma_decimal, x.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    x = x.mask(dot_decimal, x.str.replace(",", "", regex=False))
+    x = x.mask(has_comma & ~has_dot, x.str.replace(",", ".", regex=False))
+    return pd.to_numeric(x, errors="coerce").astype(float)
+
+def _key_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df[["CUENTA", "PERIODO"]], index=False).to_numpy()
+
+def validate_consumo(df: pd.DataFrame, seen: np.ndarray) -> tuple[pd.DataFrame, pd.DataFrame, np.ndarray]:
+    """Devuelve (filas válidas tipadas, reporte de rechazadas, hashes (cuenta,periodo) vistos).
+
+    `seen` es un arreglo ordenado con los hashes de bloques anteriores, así los duplicados
+    se detectan en todo el archivo y no solo dentro del bloque.
+    """
+    raw = df
+    cuenta = df["CUENTA"].astype("string").str.strip()
+    periodo = pd.to_datetime(df["PERIODO"], errors="coerce")
+    kwh = parse_number(df["KWH"])
+    lat = parse_number(df["LATITUD"])
+    lon = parse_number(df["LONGITUD"])
+    lat_min, lat_max, lon_min, lon_max = _bbox()
+
+    rules = {
+        "cuenta_vacia": cuenta.isna() | (cuenta == ""),
+        "periodo_invalido": periodo.isna(),
+        "kwh_invalido": kwh.isna(),
+        "kwh_negativo": kwh < 0,
+        # Coordenadas opcionales: solo se rechaza lo que viene y no parsea o cae fuera de la caja
+        "coordenadas_fuera_de_rango": (df["LATITUD"].notna() & ~lat.between(lat_min, lat_max))
+                                      | (df["LONGITUD"].notna() & ~lon.between(lon_min, lon_max)),
+    }
+    # Tope absoluto opcional (apagado por defecto): clientes grandes leen cientos de miles de kWh/mes
+    # y un consumo alto es justo la señal que el modelo necesita ver, no ruido a descartar
+    if settings.VALIDATION_KWH_MAX is not None:
+        rules["kwh_atipico"] = kwh > settings.VALIDATION_KWH_MAX
+
+    out = df.assign(CUENTA=cuenta, PERIODO=periodo.dt.date, KWH=kwh, LATITUD=lat, LONGITUD=lon)
+    bad = np.zeros(len(df), dtype=bool)
+    for mask in rules.values():
+        bad |= mask.fillna(False).to_numpy(dtype=bool)
+
+    # Duplicado = otra fila VÁLIDA con la misma (cuenta, periodo), en este bloque o en anteriores;
+    # una fila rechazada por otro motivo no bloquea a la versión corregida de la misma clave.
+    h = _key_hashes(out)
+    pos = np.searchsorted(seen, h)
+    in_seen = (pos < len(seen)) & (seen[np.minimum(pos, len(seen) - 1)] == h) if len(seen) else np.zeros(len(h), bool)
+    dup_in_chunk = np.zeros(len(h), dtype=bool)
+    dup_in_chunk[~bad] = pd.Series(h[~bad]).duplicated().to_numpy()
+    rules["duplicado"] = pd.Series(~bad & (in_seen | dup_in_chunk), index=df.index)
+    bad |= rules["duplicado"].to_numpy()
+
+    motivos = pd.Series("", index=df.index, dtype="string")
+    for name, mask in rules.items():
+        motivos = motivos.mask(mask.fillna(False).to_numpy(dtype=bool), motivos + name + ";")
+
+    new = np.unique(h[~bad])  # solo claves que efectivamente se cargan
+    seen = np.insert(seen, np.searchsorted(seen, new), new) if len(new) else seen
+
+    rejected = raw.loc[bad, ["CUENTA", "PERIODO", "KWH", "LATITUD", "LONGITUD"]].astype("string")
+    rejected.insert(0, "FILA", df.index[bad])
+    rejected["MOTIVOS"] = motivos[bad].str.rstrip(";")
+    return out.loc[~bad], rejected[REPORT_COLUMNS], seen
+
+def reject_ratio(ok_rows: int, rejected_rows: int) -> float:
+    total = ok_rows + rejected_rows
+    return rejected_rows / total if total else 0.0
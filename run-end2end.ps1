@@ -44,7 +44,7 @@ function HealthCheck {
 function EnsureUp {
   if ($Rebuild) {
     ComposeCmd @("down","-v","--remove-orphans")
-    ComposeCmd @("build","--no-cache","api","worker")
+    ComposeCmd @("build","--no-cache","api","worker-ingest","worker-features","worker-scoring","worker-publish","beat")
   }
   ComposeCmd @("up","-d")
   ComposeCmd @("ps")
@@ -52,8 +52,8 @@ function EnsureUp {
   ComposeCmd @("exec","-T","redis","redis-cli","PING") | ForEach-Object {
     if ($_ -match "PONG") { Write-Host "Redis PING OK" -ForegroundColor Green }
   }
-  # Worker registrado
-  ComposeCmd @("exec","-T","worker","celery","-A","app.workers.celery_app.celery_app","inspect","registered") | Out-String | ForEach-Object {
+  # Workers registrados (inspect consulta a todos los workers vía broker: ingest, features, scoring, publish)
+  ComposeCmd @("exec","-T","worker-features","celery","-A","app.workers.celery_app.celery_app","inspect","registered") | Out-String | ForEach-Object {
     if ($_ -match "app.workers.tasks.mcurvas_prepare") { Write-Host "Worker registra tareas OK" -ForegroundColor Green }
   }
   HealthCheck
@@ -93,7 +93,7 @@ function WaitJob {
       $st = Invoke-RestMethod -Uri ("http://localhost:8000/jobs/{0}" -f $JobId) -TimeoutSec 10
       $now = (Get-Date).ToString("HH:mm:ss")
       Write-Host ("[{0}] status={1}" -f $now, $st.status)
-      if ($st.status -in @("done","failed","error")) { return $st.status }
+      if ($st.status -in @("done","failed","error","rejected")) { return $st.status }
     } catch {
       Write-Host "Error consultando /jobs/$JobId, reintento..." -ForegroundColor Yellow
     }
@@ -140,6 +140,10 @@ while true; do
     echo "Job finalizado con estado: $STATUS"
     break
   fi
+  if [[ "$STATUS" == "rejected" ]]; then
+    echo "Job rechazado por validación: revisa rows_rejected y el reporte en rejects_uri." >&2
+    break
+  fi
   if echo "$OUT" | grep -qi '"failed"\|"error"\|"exception"'; then
     echo "El job reporta error/failed. Revisa logs del worker." >&2
     break
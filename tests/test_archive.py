@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+import pandas as pd
+
+from app.utils import archive
+
+def _partition(tmp_path):
+    df = pd.DataFrame({c: [None] * 3 for c in archive.COLUMNS})
+    df["cuenta"] = ["A", "B", "C"]
+    df["periodo"] = [date(2015, 1, 1)] * 3
+    df["kwh"] = [1.0, 2.0, 3.0]
+    df["loaded_at"] = [datetime(2024, 1, 1)] * 3
+    df["extra"] = 0  # columnas ajenas no se leen
+    uri = str(tmp_path / "year=2015" / "month=01" / "part-x.parquet")
+    archive.write_parquet(df, uri)
+    return uri
+
+def test_read_partition_pushes_cuenta_filter(tmp_path):
+    uri = _partition(tmp_path)
+    got = archive._read_partition(uri, ["B", "Z"])
+    assert got.columns.tolist() == archive.COLUMNS
+    assert got["cuenta"].tolist() == ["B"] and got["kwh"].tolist() == [2.0]
+    assert archive._read_partition(uri, []).empty
+    assert len(archive._read_partition(uri)) == 3
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.features import FEATURES, curvas_features, curve_features
+
+def _serie(cuenta, valores, desde="2023-01-01"):
+    return pd.DataFrame({"cuenta": cuenta, "periodo": pd.date_range(desde, periods=len(valores), freq="MS").date,
+                         "kwh": valores})
+
+def test_curve_features_uses_last_12_own_readings():
+    kwh = np.arange(1.0, 19.0)  # 18 lecturas: cuentan solo 7..18
+    got = curve_features(kwh)
+    assert got["prom_6"] == pytest.approx(np.mean(kwh[-6:]))
+    assert got["std_12"] == pytest.approx(np.std(kwh[-12:]))
+    assert got["cv"] == pytest.approx(got["std_12"] / (got["prom_6"] + 1e-6))
+    assert got["benford_pval"] == 0.5  # < 20 valores: p-valor neutro
+
+def test_curve_features_short_and_empty_series():
+    short = curve_features([4.0, np.nan, 8.0])
+    assert short["prom_6"] == pytest.approx(4.0) and short["std_12"] == pytest.approx(np.std([4.0, 0.0, 8.0]))
+    assert curve_features([]) == {"prom_6": 0.0, "std_12": 0.0, "cv": 0.0, "benford_pval": 0.5}
+
+def test_curvas_features_independent_of_batch():
+    # B tiene periodos que A no tiene: antes el pivot conjunto rellenaba con 0 los huecos de A
+    a = _serie("A", [10.0, 9.0, 8.0, 10.0, 11.0, 9.0, 10.0])
+    b = _serie("B", np.linspace(100, 200, 15), desde="2022-06-01")
+    solo = curvas_features(a).set_index("cuenta")
+    juntos = curvas_features(pd.concat([b, a]).sample(frac=1, random_state=1)).set_index("cuenta")
+    assert juntos.columns.tolist() == FEATURES and sorted(juntos.index) == ["A", "B"]
+    pd.testing.assert_series_equal(solo.loc["A"], juntos.loc["A"])
+    assert juntos.loc["B", "prom_6"] == pytest.approx(curve_features(np.linspace(100, 200, 15))["prom_6"])
+
+def test_curvas_features_empty_frame():
+    got = curvas_features(_serie("A", []))
+    assert got.empty and got.columns.tolist() == ["cuenta"] + FEATURES
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.workers import tasks
+from app.workers.validation import validate_consumo
+
+def _write(tmp_path, name, data: bytes):
+    p = tmp_path / name
+    p.write_bytes(data)
+    return str(p)
+
+def test_wide_format_reports_file_rows_across_chunks(tmp_path):
+    rows = [f"C{i};4.6;-74.{i};{'x' if i in (0, 3) else i};{i}" for i in range(6)]
+    path = _write(tmp_path, "ancho.csv", ("CUENTA;LATITUD;LONGITUD;2024-01;2024-02\n" + "\n".join(rows)).encode())
+    seen, filas, lon = np.empty(0, dtype=np.uint64), {}, {}
+    for chunk in tasks._iter_tables(path, chunksize=3):
+        ok, bad, seen = validate_consumo(tasks._prepare_consumo(chunk), seen)
+        filas.update(zip(bad["CUENTA"], bad["FILA"]))
+        lon.update(zip(ok["CUENTA"], ok["LONGITUD"]))
+    assert filas == {"C0": 0, "C3": 3}
+    # Los atributos siguen alineados con su cuenta tras reindexar por fila de origen
+    assert lon == {f"C{i}": float(f"-74.{i}") for i in range(6)}
+
+def _cuentas(path, chunksize=1000):
+    return [c for df in tasks._iter_tables(path, chunksize=chunksize) for c in df["CUENTA"].astype(str)]
+
+def test_latin1_byte_after_utf8_sample_is_decoded(tmp_path):
+    # La muestra inicial (64 KB) es ASCII puro; el primer acento latin-1 llega mucho después
+    filas = [f"C{i:06d};2024-01-01;1" for i in range(8000)] + ["PEÑA;2024-01-01;1"]
+    path = _write(tmp_path, "latin1.csv", ("CUENTA;PERIODO;KWH\n" + "\n".join(filas)).encode("latin-1"))
+    got = _cuentas(path)
+    assert len(got) == 8001 and got[-1] == "PEÑA"
+
+def test_utf8_file_is_not_touched_by_the_fallback(tmp_path):
+    filas = [f"C{i:06d};2024-01-01;1" for i in range(8000)] + ["MUÑOZ € 日本;2024-01-01;1"]
+    path = _write(tmp_path, "utf8.csv", ("CUENTA;PERIODO;KWH\n" + "\n".join(filas)).encode("utf-8"))
+    assert _cuentas(path, chunksize=97)[-1] == "MUÑOZ € 日本"
+
+def test_latin1_sample_reads_whole_file_as_latin1(tmp_path):
+    path = _write(tmp_path, "latin1_temprano.csv", "CUENTA;PERIODO;KWH\nÁLVAREZ;2024-01-01;1\n".encode("latin-1"))
+    assert tasks._sniff_encoding((tmp_path / "latin1_temprano.csv").read_bytes()) == "latin-1"
+    assert _cuentas(path) == ["ÁLVAREZ"]
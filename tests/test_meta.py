@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api.meta import to_bool
+
+def _to_bool_por_valor(v):
+    """Mapeo anterior, fila a fila (.apply), como referencia."""
+    if pd.isna(v): return None
+    s = str(v).strip().lower()
+    if s in {"1","true","t","si","sí","y","yes"}: return True
+    if s in {"0","false","f","no","n"}: return False
+    try:
+        return bool(int(float(s)))
+    except Exception:
+        return s in {"x"}
+
+VALUES = ["1", "0", " SI ", "Sí", "no", "N", "TRUE", "f", "yes", "y", "x", "X", "otro", "",
+          "2", "-1", "0.0", "0.4", "1.5", "3,0", None, np.nan]
+
+@pytest.mark.parametrize("col", [
+    pd.Series(VALUES, dtype=object),
+    pd.Series([1, 0, 2, -3, None], dtype=object),
+    pd.Series([1.0, 0.0, 0.7, np.nan]),
+    pd.Series([True, False, None], dtype=object),
+], ids=["texto", "enteros", "flotantes", "booleanos"])
+def test_to_bool_matches_per_value_mapping(col):
+    assert to_bool(col).tolist() == [_to_bool_por_valor(v) for v in col]
@@ -0,0 +1,56 @@
+import pytest
+
+from app.config.settings import settings
+from app.workers import scheduling
+
+MB = 1024 * 1024
+
+@pytest.fixture(autouse=True)
+def umbrales(monkeypatch):
+    monkeypatch.setattr(settings, "PRIORITY_SMALL_BYTES", 1 * MB)
+    monkeypatch.setattr(settings, "PRIORITY_LARGE_BYTES", 101 * MB)
+    monkeypatch.setattr(settings, "FAIRSHARE_MAX_PENALTY", 3)
+
+class _FakeRedis:
+    """Lo mínimo del hash de jobs en curso, sin servidor Redis."""
+    def __init__(self):
+        self.h = {}
+    def hget(self, key, field):
+        return self.h.get(field)
+    def hincrby(self, key, field, n):
+        self.h[field] = self.h.get(field, 0) + n
+        return self.h[field]
+    def hdel(self, key, field):
+        self.h.pop(field, None)
+    def expire(self, key, ttl):
+        pass
+
+@pytest.mark.parametrize("size,expected", [
+    (0, 0), (1 * MB, 0), (1 * MB + 1, 1), (51 * MB, 4), (101 * MB - 1, 7), (101 * MB, 8), (10**12, 8),
+])
+def test_size_priority(size, expected):
+    assert scheduling.size_priority(size) == expected
+
+def test_size_priority_is_monotonic():
+    prios = [scheduling.size_priority(s) for s in range(0, 120 * MB, MB // 2)]
+    assert prios == sorted(prios)
+
+@pytest.mark.parametrize("size,explicit,inflight,expected", [
+    (0, None, 0, 0),
+    (0, None, 2, 2),
+    (0, None, 10, 3),      # castigo acotado por FAIRSHARE_MAX_PENALTY
+    (101 * MB, None, 3, 9),  # nunca sale de 0..9
+    (101 * MB, 2, 1, 3),   # la prioridad explícita reemplaza la de tamaño, no el castigo
+    (0, -5, 0, 0),
+])
+def test_job_priority(monkeypatch, size, explicit, inflight, expected):
+    monkeypatch.setattr(scheduling, "tenant_inflight", lambda tenant: inflight)
+    assert scheduling.job_priority(size, "t1", explicit) == expected
+
+def test_acquire_release_round_trip(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(scheduling, "_redis", lambda: fake)
+    scheduling.acquire("t1"); scheduling.acquire("t1")
+    assert scheduling.tenant_inflight("t1") == 2
+    scheduling.release("t1"); scheduling.release("t1"); scheduling.release(None)
+    assert scheduling.tenant_inflight("t1") == 0 and "t1" not in fake.h
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models import simulation
+
+def _brute(df, thresholds, segment_by):
+    """Referencia fila a fila: filtra cada (segmento, umbral) por separado."""
+    groups = df.fillna({c: "" for c in segment_by}).groupby(list(segment_by), sort=False) if segment_by else [((), df)]
+    out = {}
+    for key, g in groups:
+        key = key if isinstance(key, tuple) else (key,)
+        pos = int((g["y"] == 1).sum())
+        rows = []
+        for t in thresholds:
+            a = g[g["score"] >= t]
+            lab = int((a["y"] >= 0).sum()); tp = int((a["y"] == 1).sum())
+            rows.append((len(a), round(tp / lab, 6) if lab else None, round(tp / pos, 6) if pos else None))
+        out[tuple(key)] = (len(g), pos, rows)
+    return out
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(7)
+    n = 500
+    df = pd.DataFrame({
+        # Scores redondeados para forzar empates exactos con los umbrales
+        "score": np.round(rng.random(n), 2),
+        "trafo": rng.choice(["T1", "T2", "T3", None], n),
+        "estrato": rng.choice(["1", "2"], n),
+        "tipo_usuario": "RES", "tipo_poblacion": "URB",
+        "y": rng.choice([-1, 0, 1], n, p=[0.5, 0.3, 0.2]),
+    })
+    simulation._scores.put(("job-1", "v1"), df)
+    return df
+
+@pytest.mark.parametrize("segment_by", [(), ("trafo",), ("trafo", "estrato")])
+def test_simulate_matches_brute_force(scores, segment_by):
+    thresholds = [0.0, 0.25, 0.5, 0.5000001, 0.73, 0.99, 1.0, 1.5]
+    got = simulation.simulate("job-1", thresholds, segment_by, version="v1")
+    ref = _brute(scores, thresholds, segment_by)
+    assert len(got) == len(ref)
+    for seg in got:
+        cuentas, positivos, rows = ref[tuple(seg[c] for c in segment_by)]
+        assert (seg["cuentas"], seg["positivos"]) == (cuentas, positivos)
+        assert seg["alertas"] == [r[0] for r in rows]
+        assert seg["precision"] == [r[1] for r in rows]
+        assert seg["recall"] == [r[2] for r in rows]
+
+def test_prepare_is_keyed_by_version(scores):
+    simulation._scores.put(("job-1", "v2"), scores.iloc[:10])
+    assert simulation._prepare("job-1", (), "v1")["ends"][-1] == len(scores)
+    assert simulation._prepare("job-1", (), "v2")["ends"][-1] == 10
@@ -0,0 +1,41 @@
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from app.models.supervised import enough_labels, linear_params, predict_proba, predict_proba_linear
+
+def _X(n=2000, seed=3):
+    rng = np.random.default_rng(seed)
+    # Escalas de las features reales: kWh, desviación, cv y p-valor
+    return np.column_stack([rng.gamma(2, 300, n), rng.gamma(2, 150, n), rng.random(n) * 3, rng.random(n)])
+
+def _modelos():
+    X = _X(500, seed=1)
+    y = (X[:, 2] + np.random.default_rng(2).normal(0, 0.5, len(X)) > 1.5).astype(int)
+    yield "ajustado", LogisticRegression(max_iter=1000).fit(X, y)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # pickle de otra versión de sklearn
+        yield "publicado", joblib.load("models/model_supervised.pkl")
+
+@pytest.mark.parametrize("nombre,m", list(_modelos()))
+def test_linear_scoring_matches_sklearn(nombre, m):
+    X = _X()
+    ref = predict_proba(m, X)
+    w, b = linear_params(m, dtype=np.float64)
+    np.testing.assert_allclose(predict_proba_linear(X, w, b), ref, rtol=0, atol=1e-12)
+    w32, b32 = linear_params(m)
+    got32 = predict_proba_linear(X.astype(np.float32), w32, b32)
+    assert got32.dtype == np.float32
+    np.testing.assert_allclose(got32, ref, rtol=0, atol=1e-5)
+
+def test_linear_params_only_for_binary_logistic():
+    X = _X(60)
+    assert linear_params(DecisionTreeClassifier().fit(X, X[:, 2] > 1.5)) is None
+    assert linear_params(LogisticRegression(max_iter=1000).fit(X, np.digitize(X[:, 2], [1, 2]))) is None
+
+def test_enough_labels():
+    assert not enough_labels(29, 2) and not enough_labels(500, 1) and enough_labels(30, 2)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from app.config.settings import settings
+from app.workers.validation import parse_number, reject_ratio, validate_consumo
+
+def _chunk(rows, start=0):
+    df = pd.DataFrame(rows, columns=["CUENTA", "PERIODO", "KWH", "LATITUD", "LONGITUD"])
+    df.index = range(start, start + len(df))
+    return df
+
+def _motivos(rejected):
+    return dict(zip(rejected["FILA"], rejected["MOTIVOS"]))
+
+def test_reject_reasons_per_row():
+    ok, rejected, _ = validate_consumo(_chunk([
+        ["A", "2024-01-01", "10,5", "4.6", "-74.1"],
+        ["", "2024-01-01", "1", None, None],
+        ["B", "no-es-fecha", "1", None, None],
+        ["C", "2024-01-01", "abc", None, None],
+        ["D", "2024-01-01", "-3", None, None],
+        ["E", "2024-01-01", "999999", None, None],
+        ["F", "2024-01-01", "1", "40.0", "-74.1"],
+        ["G", "2024-01-01", "-1", "40.0", None],
+    ]), np.empty(0, dtype=np.uint64))
+    # Sin VALIDATION_KWH_MAX un consumo alto (cliente grande) se carga
+    assert ok["CUENTA"].tolist() == ["A", "E"]
+    assert ok["KWH"].tolist() == [10.5, 999999.0]
+    assert _motivos(rejected) == {
+        1: "cuenta_vacia", 2: "periodo_invalido", 3: "kwh_invalido", 4: "kwh_negativo",
+        6: "coordenadas_fuera_de_rango", 7: "kwh_negativo;coordenadas_fuera_de_rango",
+    }
+
+def test_kwh_cap_is_opt_in(monkeypatch):
+    monkeypatch.setattr(settings, "VALIDATION_KWH_MAX", 50_000)
+    ok, rejected, _ = validate_consumo(_chunk([["A", "2024-01-01", "50000", None, None],
+                                               ["B", "2024-01-01", "150000", None, None]]),
+                                       np.empty(0, dtype=np.uint64))
+    assert ok["CUENTA"].tolist() == ["A"] and _motivos(rejected) == {1: "kwh_atipico"}
+
+def test_duplicates_detected_across_chunks():
+    seen = np.empty(0, dtype=np.uint64)
+    ok1, rej1, seen = validate_consumo(_chunk([["A", "2024-01-01", "1", None, None],
+                                               ["A", "2024-01-01", "2", None, None]]), seen)
+    ok2, rej2, seen = validate_consumo(_chunk([["A", "2024-01-01", "3", None, None],
+                                               ["A", "2024-02-01", "4", None, None]], start=2), seen)
+    assert ok1["KWH"].tolist() == [1.0] and _motivos(rej1) == {1: "duplicado"}
+    assert ok2["KWH"].tolist() == [4.0] and _motivos(rej2) == {2: "duplicado"}
+    assert len(seen) == 2 and seen[0] < seen[1]
+
+def test_rejected_row_does_not_block_its_corrected_key():
+    seen = np.empty(0, dtype=np.uint64)
+    _, rej1, seen = validate_consumo(_chunk([["A", "2024-01-01", "-5", None, None],
+                                             ["A", "2024-01-01", "5", None, None]]), seen)
+    ok2, rej2, seen = validate_consumo(_chunk([["B", "2024-01-01", "x", None, None]], start=2), seen)
+    ok3, rej3, _ = validate_consumo(_chunk([["B", "2024-01-01", "7", None, None]], start=3), seen)
+    assert _motivos(rej1) == {0: "kwh_negativo"}
+    assert ok2.empty and _motivos(rej2) == {2: "kwh_invalido"}
+    assert ok3["KWH"].tolist() == [7.0] and rej3.empty
+
+def test_parse_number_es_and_us_formats():
+    got = parse_number(pd.Series(["1.234,5", "1,234.5", "12,5", "12.5", " 7 ", "", None, "x"]))
+    assert got.iloc[:5].tolist() == [1234.5, 1234.5, 12.5, 12.5, 7.0]
+    assert got.iloc[5:].isna().all()
+
+def test_reject_ratio_empty_file():
+    assert reject_ratio(0, 0) == 0.0 and reject_ratio(8, 2) == 0.2